@@ -0,0 +1,373 @@
+"""
+Run a batch of questions through the MeChat agent.
+
+Questions are read from a JSONL or CSV file and answered concurrently using
+the same agent, tools and input guardrails as the Gradio chat. Each result is
+appended to a JSONL output file as soon as it completes, so an interrupted
+run can be resumed by re-running the same command.
+
+Usage:
+    python batch_questions.py questions.jsonl
+    python batch_questions.py questions.csv --output results.jsonl --concurrency 10 --runs-per-minute 30
+"""
+
+from agents import Runner, InputGuardrailTripwireTriggered
+from me_chat import MeChat, guardrail_response
+from openai import APIConnectionError, APIStatusError, RateLimitError
+from pathlib import Path
+import argparse
+import asyncio
+import csv
+import json
+import os
+import re
+import time
+
+# Configuration
+DEFAULT_OUTPUT_DIR = "logs"
+DEFAULT_CONCURRENCY = 5
+DEFAULT_RUNS_PER_MINUTE = 20
+MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 5.0
+
+# Results with these statuses are final and skipped when resuming;
+# errored questions are retried on the next run.
+COMPLETED_STATUSES = ("success", "guardrail")
+
+
+class RateLimiter:
+    """Space out run starts so no more than `runs_per_minute` begin per minute."""
+
+    def __init__(self, runs_per_minute: int):
+        self.interval = 60.0 / runs_per_minute
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        """Block until the next run is allowed to start."""
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def default_output_path(input_path: str) -> str:
+    """Derive the results file for an input file, so unrelated inputs don't share a checkpoint."""
+    return str(Path(DEFAULT_OUTPUT_DIR) / f"{Path(input_path).stem}_results.jsonl")
+
+
+def load_questions(file_path: str) -> list[dict]:
+    """
+    Load questions from a JSONL or CSV file.
+
+    Each JSONL line / CSV row must have a "question" field and may have an "id"
+    field. Items without an id are numbered by their position in the file.
+
+    Args:
+        file_path: Path to a .jsonl or .csv file
+
+    Returns:
+        list[dict]: Items with "id" and "question" keys
+
+    Raises:
+        ValueError: If a CSV has no question column, a line is not a JSON object,
+            or an id is used more than once
+    """
+    path = Path(file_path)
+    rows = []
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            if "question" not in (reader.fieldnames or []):
+                raise ValueError(f"{file_path}: CSV has no 'question' column")
+            for row in reader:
+                rows.append((reader.line_num, row))
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{file_path}:{line_number}: invalid JSON: {e.msg}") from e
+                if not isinstance(row, dict):
+                    raise ValueError(f"{file_path}:{line_number}: expected a JSON object, got {type(row).__name__}")
+                rows.append((line_number, row))
+
+    questions = []
+    seen_ids = {}
+    for index, (line_number, row) in enumerate(rows, start=1):
+        question = str(row.get("question") or "").strip()
+        if not question:
+            print(f"WARNING: {file_path}:{line_number}: skipping item with no question")
+            continue
+
+        raw_id = row.get("id")
+        item_id = str(raw_id).strip() if raw_id is not None and str(raw_id).strip() else str(index)
+        if item_id in seen_ids:
+            raise ValueError(f"{file_path}:{line_number}: duplicate id '{item_id}' (first used on line {seen_ids[item_id]})")
+        seen_ids[item_id] = line_number
+
+        questions.append({"id": item_id, "question": question})
+    return questions
+
+
+def load_results(output_path: str) -> list[dict]:
+    """
+    Load previously written results from the output file.
+
+    A partially written last line (e.g. from an interrupted run) is ignored;
+    run_batch() repairs the file before reading it.
+
+    Args:
+        output_path: Path to the JSONL results file
+
+    Returns:
+        list[dict]: The results read so far, or an empty list if the file doesn't exist
+    """
+    path = Path(output_path)
+    if not path.exists():
+        return []
+
+    results = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict):
+                results.append(record)
+    return results
+
+
+def _repair_last_line(output_path: Path) -> None:
+    """
+    Make sure the results file ends with a newline before appending to it.
+
+    An unterminated last line that is a complete record gets its newline; one
+    that doesn't parse (e.g. from an interrupted write) is cut off.
+    """
+    if not output_path.exists():
+        return
+
+    with open(output_path, "rb+") as f:
+        content = f.read()
+        if not content or content.endswith(b"\n"):
+            return
+
+        line_start = content.rfind(b"\n") + 1
+        try:
+            json.loads(content[line_start:])
+            f.write(b"\n")
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            f.truncate(line_start)
+            print(f"WARNING: Removed incomplete last line from {output_path}")
+
+
+def _usage_to_dict(source) -> dict:
+    """Extract token usage from a run result or an exception's run data."""
+    usage = getattr(getattr(source, "context_wrapper", None), "usage", None)
+    return {
+        "requests": getattr(usage, "requests", 0),
+        "input_tokens": getattr(usage, "input_tokens", 0),
+        "output_tokens": getattr(usage, "output_tokens", 0),
+        "total_tokens": getattr(usage, "total_tokens", 0),
+    }
+
+
+def _add_usage(total: dict, usage: dict) -> dict:
+    """Add one attempt's token usage to a running total."""
+    return {key: total.get(key, 0) + value for key, value in usage.items()}
+
+
+def _is_transient(e: Exception) -> bool:
+    """Whether an error is worth retrying: rate limits, connection problems and server errors."""
+    if isinstance(e, (RateLimitError, APIConnectionError)):
+        return True
+    return isinstance(e, APIStatusError) and e.status_code >= 500
+
+
+async def answer_question(me: MeChat, item: dict, semaphore: asyncio.Semaphore, rate_limiter: RateLimiter) -> dict:
+    """
+    Run a single question through the chat agent, retrying transient errors with backoff.
+
+    Only rate limit, connection and server errors are retried, since a failed
+    attempt may already have run tools with side effects. Token usage is
+    summed across all attempts.
+
+    Args:
+        me: The initialized MeChat instance whose agent answers the question
+        item: Dict with "id" and "question"
+        semaphore: Limits the number of questions in flight
+        rate_limiter: Limits how quickly new runs are started
+
+    Returns:
+        dict: The result record written to the output file
+    """
+    async with semaphore:
+        usage = {}
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            await rate_limiter.wait()
+            record = {"id": item["id"], "question": item["question"], "attempts": attempt}
+            start = time.perf_counter()
+            try:
+                result = await Runner.run(me.chat_agent, item["question"])
+                record["status"] = "success"
+                record["response"] = result.final_output if hasattr(result, 'final_output') else str(result)
+                usage = _add_usage(usage, _usage_to_dict(result))
+            except InputGuardrailTripwireTriggered as e:
+                record["status"] = "guardrail"
+                record["guardrail"] = e.guardrail_result.guardrail.get_name()
+                record["response"] = guardrail_response(e)
+                usage = _add_usage(usage, _usage_to_dict(getattr(e, "run_data", None)))
+            except Exception as e:
+                record["status"] = "error"
+                record["error"] = str(e)
+                usage = _add_usage(usage, _usage_to_dict(getattr(e, "run_data", None)))
+                retry = _is_transient(e) and attempt < MAX_ATTEMPTS
+            record["latency_seconds"] = round(time.perf_counter() - start, 3)
+            record["usage"] = usage
+
+            if record["status"] != "error" or not retry:
+                return record
+            await asyncio.sleep(RETRY_BASE_DELAY * 2 ** (attempt - 1))
+
+
+async def run_batch(me: MeChat, questions: list[dict], output_path: str, concurrency: int, runs_per_minute: int) -> dict:
+    """
+    Answer all pending questions and stream results to the output file.
+
+    A question is considered done when the output file already holds a
+    successful or guardrail-blocked result with the same id and question text.
+
+    Args:
+        me: The initialized MeChat instance
+        questions: Items loaded by load_questions()
+        output_path: JSONL file that results are appended to
+        concurrency: Maximum number of questions in flight
+        runs_per_minute: Maximum number of agent runs started per minute
+
+    Returns:
+        dict: Count of results per status for this run
+    """
+    output = Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    _repair_last_line(output)
+
+    completed = {
+        (r.get("id"), r.get("question"))
+        for r in load_results(output_path)
+        if r.get("status") in COMPLETED_STATUSES
+    }
+    pending = [item for item in questions if (item["id"], item["question"]) not in completed]
+    print(f"{len(questions) - len(pending)} questions already completed, {len(pending)} to run")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    rate_limiter = RateLimiter(runs_per_minute)
+    counts = {}
+
+    with open(output, "a", encoding="utf-8") as f:
+        tasks = [answer_question(me, item, semaphore, rate_limiter) for item in pending]
+        for done, task in enumerate(asyncio.as_completed(tasks), start=1):
+            record = await task
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            counts[record["status"]] = counts.get(record["status"], 0) + 1
+            print(f"[{done}/{len(pending)}] {record['id']}: {record['status']} ({record['latency_seconds']}s)")
+    return counts
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question for use as a response cache key."""
+    return re.sub(r'\s+', ' ', question).strip().lower()
+
+
+def write_response_cache(output_path: str, cache_path: str, questions: list[dict]) -> int:
+    """
+    Merge successful answers for the given questions into a JSON response cache.
+
+    The cache maps normalized question text to the agent's response. Existing
+    entries in the cache file are kept unless a newer answer replaces them; an
+    unreadable cache file is replaced.
+
+    Args:
+        output_path: JSONL results file written by run_batch()
+        cache_path: JSON file to create or update
+        questions: Items from the current input; results for other questions are ignored
+
+    Returns:
+        int: Number of entries in the cache after merging
+    """
+    path = Path(cache_path)
+    cache = {}
+    if path.exists():
+        try:
+            cache = json.loads(path.read_text(encoding="utf-8"))
+        except json.JSONDecodeError as e:
+            print(f"WARNING: Ignoring unreadable response cache {cache_path}: {e}")
+        if not isinstance(cache, dict):
+            print(f"WARNING: Ignoring response cache {cache_path}: expected a JSON object")
+            cache = {}
+
+    wanted = {(item["id"], item["question"]) for item in questions}
+    for record in load_results(output_path):
+        if record.get("status") == "success" and (record.get("id"), record.get("question")) in wanted:
+            cache[normalize_question(record["question"])] = record["response"]
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(cache, ensure_ascii=False, indent=2), encoding="utf-8")
+    return len(cache)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a batch of questions through the MeChat agent.")
+    parser.add_argument("input", help="JSONL or CSV file with a 'question' field (and optional 'id')")
+    parser.add_argument("--output", help=f"JSONL results file, also used to resume (default: {DEFAULT_OUTPUT_DIR}/<input name>_results.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help=f"Maximum questions in flight (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument(
+        "--runs-per-minute", type=int, default=DEFAULT_RUNS_PER_MINUTE,
+        help=f"Maximum agent runs started per minute (default: {DEFAULT_RUNS_PER_MINUTE}). "
+             "This does not bound the OpenAI request rate: each run makes a moderation call "
+             "plus one model request per turn, including tool calls."
+    )
+    parser.add_argument("--cache-out", help="Optional JSON file to pre-populate with question -> response pairs")
+    parser.add_argument(
+        "--no-push", action="store_true",
+        help="Don't send Pushover notifications. Without this flag, every record_unknown_question "
+             "and record_user_details tool call in the batch sends a real push notification."
+    )
+    args = parser.parse_args()
+
+    if args.concurrency < 1 or args.runs_per_minute < 1:
+        parser.error("--concurrency and --runs-per-minute must be at least 1")
+
+    output_path = args.output or default_output_path(args.input)
+
+    if args.no_push:
+        os.environ["PUSHOVER_DISABLED"] = "true"
+
+    try:
+        questions = load_questions(args.input)
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        parser.error(str(e))
+    print(f"Loaded {len(questions)} questions from {args.input}")
+
+    me = MeChat()
+    print("✓ MeChat initialized successfully")
+
+    try:
+        counts = asyncio.run(run_batch(me, questions, output_path, args.concurrency, args.runs_per_minute))
+        print(f"✓ Batch complete: {counts or 'nothing to run'}. Results written to {output_path}")
+    finally:
+        # Written even if the batch is interrupted, so finished answers are not lost
+        if args.cache_out:
+            entries = write_response_cache(output_path, args.cache_out, questions)
+            print(f"✓ Response cache written to {args.cache_out} ({entries} entries)")
+
+
+if __name__ == "__main__":
+    main()
@@ -108,25 +108,39 @@ With this context, please chat with the user, always staying in character as {se
             # Handle guardrail violations gracefully
             guardrail_name = e.guardrail_result.guardrail.get_name()
             output_info = e.guardrail_result.output.output_info
-
             print(f"Input guardrail triggered: {guardrail_name}, info: {output_info}")
-
-            # Return user-friendly error messages based on the guardrail
-            if guardrail_name == "content_moderation":
-                return "I'm sorry, but I cannot process that message as it appears to contain content that violates our usage policies. Please rephrase your question in a respectful manner."
-            elif guardrail_name == "input_length_validation":
-                max_length = output_info.get('max_length', 10000)
-                return f"I'm sorry, but your message is too long. Please keep your message under {max_length} characters."
-            elif guardrail_name == "input_format_validation":
-                reason = output_info.get('reason', 'invalid format')
-                return f"I'm sorry, but your message has a formatting issue: {reason}. Please try again."
-            else:
-                return "I'm sorry, but I couldn't process your message. Please try rephrasing your question."
+            return guardrail_response(e)
         except Exception as e:
             print(f"Error in chat: {str(e)}")
             return f"I apologize, but an error occurred while processing your message. Please try again."
 
 
+def guardrail_response(e: InputGuardrailTripwireTriggered) -> str:
+    """
+    Build a user-friendly message for a triggered input guardrail.
+
+    Args:
+        e: The guardrail tripwire exception raised by the Runner
+
+    Returns:
+        str: The message to show the user
+    """
+    guardrail_name = e.guardrail_result.guardrail.get_name()
+    output_info = e.guardrail_result.output.output_info
+
+    # Return user-friendly error messages based on the guardrail
+    if guardrail_name == "content_moderation":
+        return "I'm sorry, but I cannot process that message as it appears to contain content that violates our usage policies. Please rephrase your question in a respectful manner."
+    elif guardrail_name == "input_length_validation":
+        max_length = output_info.get('max_length', 10000)
+        return f"I'm sorry, but your message is too long. Please keep your message under {max_length} characters."
+    elif guardrail_name == "input_format_validation":
+        reason = output_info.get('reason', 'invalid format')
+        return f"I'm sorry, but your message has a formatting issue: {reason}. Please try again."
+    else:
+        return "I'm sorry, but I couldn't process your message. Please try rephrasing your question."
+
+
 if __name__ == "__main__":
     print(f"Starting MeChat for {NAME}...")
     me = MeChat()
@@ -0,0 +1,4 @@
+import os
+
+# utils.input_guardrails creates an OpenAI client at import time, which requires an API key
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
@@ -0,0 +1,239 @@
+"""Tests for the batch question runner."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+from agents import InputGuardrailTripwireTriggered, MaxTurnsExceeded
+from openai import RateLimitError
+
+import batch_questions
+
+
+def _write_lines(path, lines):
+    path.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+    return str(path)
+
+
+def _result(output="answer", total_tokens=5):
+    usage = SimpleNamespace(requests=1, input_tokens=3, output_tokens=total_tokens - 3, total_tokens=total_tokens)
+    return SimpleNamespace(final_output=output, context_wrapper=SimpleNamespace(usage=usage))
+
+
+def _rate_limit_error(usage_source=None):
+    response = httpx.Response(429, request=httpx.Request("POST", "https://api.openai.com/v1/responses"))
+    error = RateLimitError("rate limited", response=response, body=None)
+    error.run_data = usage_source
+    return error
+
+
+def _guardrail_error(name="content_moderation"):
+    guardrail_result = MagicMock()
+    guardrail_result.guardrail.get_name.return_value = name
+    guardrail_result.output.output_info = {"flagged": True}
+    return InputGuardrailTripwireTriggered(guardrail_result)
+
+
+@pytest.fixture
+def me():
+    return SimpleNamespace(chat_agent=object())
+
+
+@pytest.fixture(autouse=True)
+def fast_limits(monkeypatch):
+    monkeypatch.setattr(batch_questions, "RETRY_BASE_DELAY", 0)
+
+
+def _run_batch(me, questions, output_path):
+    return asyncio.run(batch_questions.run_batch(me, questions, output_path, concurrency=2, runs_per_minute=6000))
+
+
+class TestLoadQuestions:
+    def test_jsonl_ids_default_to_position(self, tmp_path):
+        path = _write_lines(tmp_path / "q.jsonl", [
+            json.dumps({"question": "First?"}),
+            json.dumps({"id": 0, "question": "Zero?"}),
+            json.dumps({"id": "abc", "question": "  Third?  "}),
+        ])
+        assert batch_questions.load_questions(path) == [
+            {"id": "1", "question": "First?"},
+            {"id": "0", "question": "Zero?"},
+            {"id": "abc", "question": "Third?"},
+        ]
+
+    def test_csv_without_question_column(self, tmp_path):
+        path = tmp_path / "q.csv"
+        path.write_text("id,text\nx,Hello?\n", encoding="utf-8")
+        with pytest.raises(ValueError, match="no 'question' column"):
+            batch_questions.load_questions(str(path))
+
+    def test_csv(self, tmp_path):
+        path = tmp_path / "q.csv"
+        path.write_text("id,question\nx,Hello?\n,No id?\ny,\n", encoding="utf-8")
+        assert batch_questions.load_questions(str(path)) == [
+            {"id": "x", "question": "Hello?"},
+            {"id": "2", "question": "No id?"},
+        ]
+
+    def test_non_object_line_reports_line_number(self, tmp_path):
+        path = _write_lines(tmp_path / "q.jsonl", [json.dumps({"question": "ok"}), '"just a string"'])
+        with pytest.raises(ValueError, match=r"q\.jsonl:2: expected a JSON object"):
+            batch_questions.load_questions(path)
+
+    def test_invalid_json_reports_line_number(self, tmp_path):
+        path = _write_lines(tmp_path / "q.jsonl", ['{"question": "ok"}', '{"question": '])
+        with pytest.raises(ValueError, match=r"q\.jsonl:2: invalid JSON"):
+            batch_questions.load_questions(path)
+
+    def test_duplicate_ids_rejected(self, tmp_path):
+        path = _write_lines(tmp_path / "q.jsonl", [
+            json.dumps({"id": "x", "question": "One?"}),
+            json.dumps({"id": "x", "question": "Two?"}),
+        ])
+        with pytest.raises(ValueError, match="duplicate id 'x'"):
+            batch_questions.load_questions(path)
+
+
+def test_load_results_skips_partial_line(tmp_path):
+    path = tmp_path / "out.jsonl"
+    path.write_text('{"id": "a", "status": "success"}\n{"id": "b", "quest', encoding="utf-8")
+    assert batch_questions.load_results(str(path)) == [{"id": "a", "status": "success"}]
+
+
+def test_default_output_path_depends_on_input():
+    assert batch_questions.default_output_path("data/eval.jsonl") != batch_questions.default_output_path("data/warm.csv")
+
+
+class TestRunBatch:
+    def test_writes_results_with_usage(self, tmp_path, me, mocker):
+        async def run(agent, question):
+            if question == "Bad?":
+                raise _guardrail_error()
+            return _result()
+
+        mocker.patch("batch_questions.Runner.run", new=AsyncMock(side_effect=run))
+        output = str(tmp_path / "out.jsonl")
+
+        counts = _run_batch(me, [{"id": "1", "question": "Hi?"}, {"id": "2", "question": "Bad?"}], output)
+
+        assert counts == {"success": 1, "guardrail": 1}
+        records = {r["id"]: r for r in batch_questions.load_results(output)}
+        assert records["1"]["response"] == "answer"
+        assert records["1"]["usage"]["total_tokens"] == 5
+        assert records["2"]["guardrail"] == "content_moderation"
+        assert records["2"]["usage"] == {"requests": 0, "input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+
+    def test_resume_matches_id_and_question(self, tmp_path, me, mocker):
+        run = mocker.patch("batch_questions.Runner.run", new=AsyncMock(return_value=_result()))
+        output = str(tmp_path / "out.jsonl")
+
+        _run_batch(me, [{"id": "1", "question": "A?"}, {"id": "2", "question": "B?"}], output)
+        _run_batch(me, [{"id": "1", "question": "A?"}, {"id": "2", "question": "Other?"}, {"id": "3", "question": "C?"}], output)
+
+        asked = [call.args[1] for call in run.call_args_list]
+        assert sorted(asked) == ["A?", "B?", "C?", "Other?"]
+
+    def test_transient_errors_are_retried_and_usage_summed(self, tmp_path, me, mocker):
+        failed_attempt = _result(total_tokens=7)
+        run = mocker.patch("batch_questions.Runner.run", new=AsyncMock(side_effect=[_rate_limit_error(failed_attempt), _result()]))
+        output = str(tmp_path / "out.jsonl")
+
+        counts = _run_batch(me, [{"id": "1", "question": "A?"}], output)
+
+        assert counts == {"success": 1}
+        assert run.call_count == 2
+        record = batch_questions.load_results(output)[0]
+        assert record["attempts"] == 2
+        assert record["usage"] == {"requests": 2, "input_tokens": 6, "output_tokens": 6, "total_tokens": 12}
+
+    def test_gives_up_after_max_attempts(self, tmp_path, me, mocker):
+        async def always_rate_limited(agent, question):
+            raise _rate_limit_error()
+
+        run = mocker.patch("batch_questions.Runner.run", new=AsyncMock(side_effect=always_rate_limited))
+        output = str(tmp_path / "out.jsonl")
+
+        counts = _run_batch(me, [{"id": "1", "question": "A?"}], output)
+
+        assert counts == {"error": 1}
+        assert run.call_count == batch_questions.MAX_ATTEMPTS
+        record = batch_questions.load_results(output)[0]
+        assert record["error"] == "rate limited"
+        assert "usage" in record
+
+    def test_non_transient_errors_are_not_retried(self, tmp_path, me, mocker):
+        run = mocker.patch("batch_questions.Runner.run", new=AsyncMock(side_effect=MaxTurnsExceeded("too many turns")))
+        output = str(tmp_path / "out.jsonl")
+
+        counts = _run_batch(me, [{"id": "1", "question": "A?"}], output)
+
+        assert counts == {"error": 1}
+        assert run.call_count == 1
+
+    def test_partial_last_line_does_not_swallow_next_record(self, tmp_path, me, mocker):
+        mocker.patch("batch_questions.Runner.run", new=AsyncMock(return_value=_result()))
+        output = tmp_path / "out.jsonl"
+        output.write_text('{"id": "x", "question": "X?", "status": "success"}\n{"id":"y","quest', encoding="utf-8")
+
+        _run_batch(me, [{"id": "z", "question": "Z?"}], str(output))
+
+        assert [r["id"] for r in batch_questions.load_results(str(output))] == ["x", "z"]
+
+    def test_valid_last_line_without_newline_is_kept(self, tmp_path, me, mocker):
+        run = mocker.patch("batch_questions.Runner.run", new=AsyncMock(return_value=_result()))
+        output = tmp_path / "out.jsonl"
+        output.write_text('{"id": "x", "question": "X?", "status": "success"}', encoding="utf-8")
+
+        _run_batch(me, [{"id": "x", "question": "X?"}, {"id": "y", "question": "Y?"}], str(output))
+
+        assert [call.args[1] for call in run.call_args_list] == ["Y?"]
+        assert [r["id"] for r in batch_questions.load_results(str(output))] == ["x", "y"]
+
+
+def test_rate_limiter_spaces_run_starts(monkeypatch):
+    clock = {"now": 100.0}
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(batch_questions.time, "monotonic", lambda: clock["now"])
+    monkeypatch.setattr(batch_questions.asyncio, "sleep", fake_sleep)
+
+    async def start_three():
+        limiter = batch_questions.RateLimiter(runs_per_minute=60)
+        for _ in range(3):
+            await limiter.wait()
+
+    asyncio.run(start_three())
+    assert sleeps == [1.0, 2.0]
+
+
+class TestWriteResponseCache:
+    def _results(self, tmp_path):
+        return _write_lines(tmp_path / "out.jsonl", [
+            json.dumps({"id": "1", "question": "What  IS this?", "status": "success", "response": "new"}),
+            json.dumps({"id": "2", "question": "Blocked?", "status": "guardrail", "response": "no"}),
+            json.dumps({"id": "9", "question": "Unrelated?", "status": "success", "response": "old batch"}),
+        ])
+
+    def test_merges_current_questions_only(self, tmp_path):
+        output = self._results(tmp_path)
+        cache_path = tmp_path / "cache.json"
+        cache_path.write_text(json.dumps({"kept": "value", "what is this?": "stale"}), encoding="utf-8")
+        questions = [{"id": "1", "question": "What  IS this?"}, {"id": "2", "question": "Blocked?"}]
+
+        assert batch_questions.write_response_cache(output, str(cache_path), questions) == 2
+        assert json.loads(cache_path.read_text(encoding="utf-8")) == {"kept": "value", "what is this?": "new"}
+
+    def test_replaces_corrupt_cache(self, tmp_path):
+        output = self._results(tmp_path)
+        cache_path = tmp_path / "cache.json"
+        cache_path.write_text("{not json", encoding="utf-8")
+
+        batch_questions.write_response_cache(output, str(cache_path), [{"id": "1", "question": "What  IS this?"}])
+
+        assert json.loads(cache_path.read_text(encoding="utf-8")) == {"what is this?": "new"}
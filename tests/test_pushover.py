@@ -0,0 +1,11 @@
+"""Tests for the Pushover notification utility."""
+
+from utils import pushover
+
+
+def test_push_is_skipped_when_disabled(monkeypatch, mocker):
+    monkeypatch.setenv("PUSHOVER_DISABLED", "true")
+    post = mocker.patch("utils.pushover.requests.post")
+
+    assert pushover.push("hello") is True
+    post.assert_not_called()
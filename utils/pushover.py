@@ -13,12 +13,18 @@ def push(text: str) -> bool:
     """
     Send a push notification via Pushover API.
 
+    Sending is skipped (and reported as successful) when PUSHOVER_DISABLED is
+    set to "true", e.g. during batch runs.
+
     Args:
         text: The message text to send
 
     Returns:
         bool: True if notification was sent successfully, False otherwise
     """
+    if os.getenv("PUSHOVER_DISABLED", "").lower() == "true":
+        return True
+
     try:
         token = os.getenv("PUSHOVER_TOKEN")
         user = os.getenv("PUSHOVER_USER")